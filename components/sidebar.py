@@ -4,4 +4,16 @@ import streamlit as st
 def sidebar():
     st.sidebar.title("Sidebar")
     st.sidebar.write("This is a sidebar component.")
-    
\ No newline at end of file
+
+def date_range_filter(min_date, max_date):
+    """Single sidebar date range picker. Returns (start_date, end_date)."""
+    date_range = st.sidebar.date_input(
+        "Select Date Range",
+        (min_date, max_date),
+        min_value=min_date,
+        max_value=max_date
+    )
+    # While the user is mid-selection only the start date is set
+    start_date = date_range[0] if len(date_range) > 0 else min_date
+    end_date = date_range[1] if len(date_range) > 1 else max_date
+    return start_date, end_date
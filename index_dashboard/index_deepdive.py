@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 
-from utils.data_processing import load_daily_price_data, create_wide_price_df,load_daily_ratio_data
+from utils.data_processing import load_daily_price_data, get_index_types, get_symbols_for, create_wide_price_df_cached,load_daily_ratio_data, date_mask, symbol_mask
+from components.sidebar import date_range_filter
 from utils.visualizations import plot_index_deepdive,plot_correlation_heatmap,plot_financial_ratios
 
 # Load data
@@ -15,43 +16,28 @@ def index_deepdive(df):
     st.sidebar.header("Filters")
 
     # Index Type dropdown
-    index_types = df['index_type'].unique()
+    index_types = get_index_types()
     selected_index_type = st.sidebar.selectbox("Select Index Type", index_types, index=1)
 
     # Index Name multiselect
-    index_names = df[df['index_type'] == selected_index_type]['symbol'].unique()
+    index_names = get_symbols_for(selected_index_type)
     selected_indices = st.sidebar.multiselect("Select Indices", index_names)
 
     # Date range slider
     min_date = df['date'].min().date()
     max_date = df['date'].max().date()
-    start_date = st.sidebar.date_input(
-        "Select Date Range",
-        min_date,
-        min_value=min_date,
-        max_value=max_date
-    )
-    
-    end_date = st.sidebar.date_input(
-        "Select Date Range",
-        max_date,
-        min_value=min_date,
-        max_value=max_date
-    )
+    start_date, end_date = date_range_filter(min_date, max_date)
+
+    if not selected_indices:
+        st.info('Please select the indices from the sidebar to continue')
+        return
 
     # Filter data based on selections
-    filtered_df = df[
-        (df['index_type'] == selected_index_type) &
-        (df['symbol'].isin(selected_indices)) &
-        (df['date'].dt.date >= start_date) &
-        (df['date'].dt.date <= end_date)
-    ].pipe(create_wide_price_df)
+    filtered_df = create_wide_price_df_cached(selected_index_type, None, start_date, end_date)
     
-    filtered_ratio_df = ratio_df[
-        (ratio_df['symbol'].isin(selected_indices)) &
-        (ratio_df['date'].dt.date >= start_date) &
-        (ratio_df['date'].dt.date <= end_date)
-    ]
+    # symbols first: the date mask then only runs over the selected indices' rows
+    filtered_ratio_df = ratio_df[symbol_mask(ratio_df['symbol'], selected_indices)]
+    filtered_ratio_df = filtered_ratio_df[date_mask(filtered_ratio_df['date'].values, start_date, end_date)]
 
     # Create tabs
     tab1, tab2 = st.tabs(["Historical Timeseries", "Rolling Timeseries"])
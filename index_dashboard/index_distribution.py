@@ -1,107 +1,70 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
 from datetime import datetime
-from utils.data_processing import load_daily_price_data, performance_stats_instruments, calculate_returns_wide,create_wide_price_df
+from utils.data_processing import load_daily_price_data, get_index_types, calculate_returns_wide_cached, create_wide_price_df_cached, performance_stats_cached, monthly_logrets_table, build_monthly_return_table
+from components.sidebar import date_range_filter
 from utils.visualizations import plot_index_returns_boxplots, plot_index_returns_histograms,plot_correlation_heatmap,format_performace_stats_dataframe
 
+CATEGORY_VIEWS = {"Broad Index Performance": ('BROAD', 'Broad'),
+                  "Sectoral Index Performance": ('SECTORAL', 'Sectoral')}
+
 #load data
 df = load_daily_price_data()
+
+def category_performance(selected_index_type, index_category, category_label, start_date, end_date):
+    st.subheader(f'NIFTY {category_label} Indices Performance Stats')
+    st.dataframe(format_performace_stats_dataframe(performance_stats_cached(selected_index_type, index_category, start_date, end_date)),use_container_width=True)
+
+    logrets_df = calculate_returns_wide_cached(selected_index_type, index_category, start_date, end_date)
+    index_list =  logrets_df.columns.to_list()
+    corr_plot = plot_correlation_heatmap(create_wide_price_df_cached(selected_index_type, index_category, start_date, end_date), index_list)
+    st.subheader(f'NIFTY {category_label} Indices correlation')
+    st.plotly_chart(corr_plot, use_container_width=True)
+    st.subheader(f'Nifty {category_label} Indices Returns')
+    monthly_returns_fragment(selected_index_type, index_list, index_category, start_date.year, end_date.year)
+
+# The index multiselect only slices the precomputed monthly returns, so changing
+# it reruns just this fragment instead of the whole page
+@st.fragment
+def monthly_returns_fragment(selected_index_type, index_list, index_category, start_year, end_year):
+    selected_index = st.multiselect('select index', options= index_list, key=f'monthly_returns_{index_category}')
+    if not selected_index:
+        st.info('Select one or more indices to see their monthly returns')
+        return
+    monthly_logrets = monthly_logrets_table()
+    monthly_logrets = monthly_logrets[
+        (monthly_logrets['index_type'] == selected_index_type) &
+        (monthly_logrets['symbol'].isin(selected_index)) &
+        (monthly_logrets['year'].between(start_year, end_year))
+    ]
+    st.dataframe(
+            (build_monthly_return_table(monthly_logrets)
+            .style.format('{:.1f}%',na_rep='-',subset=[ 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 'ytd'])
+            ),use_container_width=True
+        )
+
 def index_distribution(df):
 
     # Sidebar filters
     st.sidebar.header("Filters")
 
     # Index Type dropdown
-    index_types = df['index_type'].unique()
+    index_types = get_index_types()
     selected_index_type = st.sidebar.selectbox("Select Index Type", index_types, index=1)
 
     # Date range slider
     min_date = df['date'].min().date()
     max_date = df['date'].max().date()
-    start_date = st.sidebar.date_input(
-        "Select Date Range",
-        min_date,
-        min_value=min_date,
-        max_value=max_date
-    )
-    
-    end_date = st.sidebar.date_input(
-        "Select Date Range",
-        max_date,
-        min_value=min_date,
-        max_value=max_date
-    )
-    # Filter data based on selections
-    filtered_df = df[
-        (df['index_type'] == selected_index_type) &
-        (df['date'].dt.date >= start_date) &
-        (df['date'].dt.date <= end_date)
-    ]
-
+    start_date, end_date = date_range_filter(min_date, max_date)
     # # Display boxplot
     # boxplot_fig = plot_index_returns_boxplots(filtered_df, selected_index_type, selected_index_category)
     # st.plotly_chart(boxplot_fig,use_container_width=True)
     
     # Performance stats
-    tab1, tab2 = st.tabs(["Broad Index Performance", "Sectoral Index Performance"])
-    with tab1:
-        broad_filtered_df = filtered_df.query('index_category=="BROAD"')
-        st.subheader('NIFTY Broad Indices Performance Stats')
-        st.dataframe(format_performace_stats_dataframe(performance_stats_instruments(calculate_returns_wide(broad_filtered_df,'simple'))),use_container_width=True)
-        logrets_df = calculate_returns_wide(broad_filtered_df)
-        index_list =  logrets_df.columns.to_list()
-        corr_plot_broad = plot_correlation_heatmap(create_wide_price_df(broad_filtered_df), index_list)
-        st.subheader('NIFTY Broad Indices correlation')
-        st.plotly_chart(corr_plot_broad, use_container_width=True)
-        st.subheader('Nifty Broad Indices Returns')
-        selected_index = st.multiselect('select index', options= index_list)
-        st.dataframe(
-                (logrets_df.stack()
-                .reset_index()
-                .groupby(['symbol',pd.Grouper(key = 'date',freq='ME')])
-                .sum()
-                .reset_index()
-                .assign(year = lambda x: x.date.dt.year.astype('str'),
-                        month = lambda x: x.date.dt.month)
-                .pivot(columns='month',values=0,index= ['symbol','year'])
-                .assign(ytd = lambda x:x.sum(axis=1))
-                .apply(np.expm1)
-                .mul(100)
-                .reset_index()
-                .query('symbol in @selected_index')
-                .style.format('{:.1f}%',na_rep='-',subset=[ 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 'ytd'])
-                ),use_container_width=True
-            )
-    with tab2:
-        sector_filtered_df = filtered_df.query('index_category=="SECTORAL"')
-        st.subheader('NIFTY Sectoral Indices Performance Stats')
-        st.dataframe(format_performace_stats_dataframe(performance_stats_instruments(calculate_returns_wide(sector_filtered_df,'simple'))),use_container_width=True)
-    
-        logrets_df = calculate_returns_wide(sector_filtered_df)
-        index_list =  logrets_df.columns.to_list()
-        corr_plot_sectoral = plot_correlation_heatmap(create_wide_price_df(sector_filtered_df), index_list)
-        st.subheader('NIFTY Sectoral Indices correlation')
-        st.plotly_chart(corr_plot_sectoral, use_container_width=True)
-        st.subheader('Nifty Sectoral Indices Returns')
-        selected_index = st.multiselect('select index', options= index_list)
-        st.dataframe(
-                (logrets_df.stack()
-                .reset_index()
-                .groupby(['symbol',pd.Grouper(key = 'date',freq='ME')])
-                .sum()
-                .reset_index()
-                .assign(year = lambda x: x.date.dt.year.astype('str'),
-                        month = lambda x: x.date.dt.month)
-                .pivot(columns='month',values=0,index= ['symbol','year'])
-                .assign(ytd = lambda x:x.sum(axis=1))
-                .apply(np.expm1)
-                .mul(100)
-                .reset_index()
-                .query('symbol in @selected_index')
-                .style.format('{:.1f}%',na_rep='-',subset=[ 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 'ytd'])
-                ),use_container_width=True
-            )
+    # A radio instead of st.tabs: tabs execute every tab's body on each rerun,
+    # this only runs the pipeline of the category being viewed
+    view = st.radio("View", list(CATEGORY_VIEWS), horizontal=True, key="dist_choice", label_visibility="collapsed")
+    index_category, category_label = CATEGORY_VIEWS[view]
+    category_performance(selected_index_type, index_category, category_label, start_date, end_date)
         
     # # Display histogram
     # histogram_fig = plot_index_returns_histograms(filtered_df, selected_index_type, selected_index_category)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import pandas as pd
+import pyarrow.parquet as pq
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+from pyarrow import fs
+
+from utils.cloudstorage import CloudflareR2
+
+BUCKET = 'indices'
+PREFIX = 'daily/'
+CREDENTIALS = {'CLOUDFLARE_ACCOUNT_ID': 'account', 'CLOUDFLARE_ACCESS_KEY_ID': 'key',
+               'CLOUDFLARE_ACCESS_KEY_SECRET': 'secret'}
+
+
+class TestCloudflareR2Listing(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, CREDENTIALS):
+            self.r2 = CloudflareR2()
+        self.stubber = Stubber(self.r2.s3_client)
+        self.addCleanup(self.stubber.deactivate)
+
+    def add_two_pages(self):
+        """Stub a listing split over two list_objects_v2 pages, the first one truncated."""
+        request = {'Bucket': BUCKET, 'Prefix': PREFIX, 'Delimiter': '/', 'MaxKeys': 1000}
+        self.stubber.add_response('list_objects_v2', {
+            'IsTruncated': True,
+            'NextContinuationToken': 'page-2',
+            'Contents': [{'Key': PREFIX}, {'Key': 'daily/a.parquet'}, {'Key': 'daily/b.parquet'}],
+            'CommonPrefixes': [{'Prefix': 'daily/2023/'}],
+        }, request)
+        self.stubber.add_response('list_objects_v2', {
+            'IsTruncated': False,
+            'Contents': [{'Key': 'daily/c.parquet'}],
+            'CommonPrefixes': [{'Prefix': 'daily/2024/'}],
+        }, {**request, 'ContinuationToken': 'page-2'})
+
+    def test_list_pages_follows_continuation_token(self):
+        self.add_two_pages()
+        with self.stubber:
+            pages = list(self.r2._list_pages(BUCKET, PREFIX))
+        self.assertEqual(len(pages), 2)
+        self.stubber.assert_no_pending_responses()
+
+    def test_list_files_collects_every_page(self):
+        self.add_two_pages()
+        with self.stubber:
+            listing = self.r2.list_files(BUCKET, PREFIX)
+        self.assertEqual(listing, {'files': ['daily/a.parquet', 'daily/b.parquet', 'daily/c.parquet'],
+                                   'folders': ['daily/2023/', 'daily/2024/']})
+        self.stubber.assert_no_pending_responses()
+
+    def test_list_files_iter_fetches_pages_lazily(self):
+        self.add_two_pages()
+        with self.stubber:
+            files = self.r2.list_files_iter(BUCKET, PREFIX)
+            self.assertEqual(next(files), 'daily/a.parquet')
+            # the second page is only requested once the first one is used up
+            with self.assertRaises(AssertionError):
+                self.stubber.assert_no_pending_responses()
+            self.assertEqual(list(files), ['daily/b.parquet', 'daily/c.parquet'])
+        self.stubber.assert_no_pending_responses()
+
+    def test_read_files_reads_every_listed_file(self):
+        self.add_two_pages()
+        contents = {'daily/a.parquet': b'a', 'daily/b.parquet': b'bb', 'daily/c.parquet': b'ccc'}
+        for key, body in contents.items():
+            self.stubber.add_response('get_object', {'Body': StreamingBody(BytesIO(body), len(body))},
+                                      {'Bucket': BUCKET, 'Key': key})
+        with self.stubber:
+            # a single worker keeps the get_object calls in the stubbed order
+            files = self.r2.read_files(BUCKET, self.r2.list_files_iter(BUCKET, PREFIX), max_workers=1)
+        self.assertEqual({key: content.read() for key, content in files.items()}, contents)
+        self.stubber.assert_no_pending_responses()
+
+
+
+class TestCloudflareR2Parquet(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, CREDENTIALS):
+            self.r2 = CloudflareR2()
+        # a local directory stands in for the bucket
+        bucket = tempfile.TemporaryDirectory()
+        self.addCleanup(bucket.cleanup)
+        self.bucket = bucket.name
+        self.prices = pd.DataFrame({'symbol': ['A', 'B'], 'close': [1.5, 2.5], 'volume': [10, 20]})
+        os.makedirs(os.path.join(self.bucket, 'daily'))
+        self.prices.to_parquet(os.path.join(self.bucket, 'daily', 'prices.parquet'), index=False)
+
+    def test_arrow_filesystem_is_created_on_first_use(self):
+        with mock.patch.dict(os.environ, CREDENTIALS), \
+                mock.patch.object(CloudflareR2, 'create_arrow_filesystem', return_value=fs.LocalFileSystem()) as create:
+            r2 = CloudflareR2()
+            create.assert_not_called()
+            self.assertIs(r2.arrow_fs, r2.arrow_fs)
+        create.assert_called_once()
+
+    def test_read_parquet_reads_only_the_requested_columns(self):
+        self.r2.arrow_fs = fs.LocalFileSystem()
+        with mock.patch('utils.cloudstorage.pq.read_table', wraps=pq.read_table) as read_table:
+            prices = self.r2.read_parquet(self.bucket, 'daily/prices.parquet', columns=['symbol', 'close'])
+        pd.testing.assert_frame_equal(prices, self.prices[['symbol', 'close']])
+        self.assertEqual(read_table.call_args.kwargs['columns'], ['symbol', 'close'])
+        pd.testing.assert_frame_equal(self.r2.read_parquet(self.bucket, 'daily/prices.parquet'), self.prices)
+
+    def test_read_parquet_missing_file(self):
+        self.r2.arrow_fs = fs.LocalFileSystem()
+        with self.assertRaisesRegex(Exception, "File 'daily/missing.parquet' does not exist in bucket"):
+            self.r2.read_parquet(self.bucket, 'daily/missing.parquet')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,148 @@
-
 import unittest
+from datetime import date
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (date_mask, symbol_mask, trailing_nanmean, calculate_returns_wide, calculate_stats,
+                                   performance_stats_instruments, monthly_logrets_table, build_monthly_return_table,
+                                   NORMAL_DISTR_RATIO, MONTH, WEEK)
+
+STAT_NAMES = ['ann_mean', 'ann_std', 'sharpe_ratio', 'skew', 'avg_drawdown', 'max_drawdown',
+              'quant_ratio_lower', 'quant_ratio_upper']
+
 
 class TestDataProcessing(unittest.TestCase):
-    def test_process_data(self):
-        # Add your test cases here
-        pass
+    def test_date_mask_is_inclusive_by_calendar_day(self):
+        dates = pd.to_datetime(['2024-01-01 00:00', '2024-01-02 15:30', '2024-01-03 00:00', '2024-01-04 00:00']).values
+        mask = date_mask(dates, date(2024, 1, 2), date(2024, 1, 3))
+        np.testing.assert_array_equal(mask, [False, True, True, False])
+
+    def test_date_mask_open_ended(self):
+        dates = pd.to_datetime(['2024-01-01', '2024-01-02']).values
+        np.testing.assert_array_equal(date_mask(dates), [True, True])
+        np.testing.assert_array_equal(date_mask(dates, end_date=date(2024, 1, 1)), [True, False])
+
+    def test_symbol_mask_ignores_unknown_symbols(self):
+        symbols = pd.Series(['A', 'B', 'C', 'A'], dtype='category')
+        np.testing.assert_array_equal(symbol_mask(symbols, ['A', 'Z']), [True, False, False, True])
+
+    def test_calculate_returns_wide_ignores_descriptive_columns(self):
+        prices = pd.DataFrame({'index_name': 'Nifty', 'index_type': 'TRI', 'index_category': 'BROAD',
+                               'symbol': ['A', 'B', 'A', 'B', 'A', 'B'],
+                               'date': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-01-02',
+                                                       '2024-01-02', '2024-01-03', '2024-01-03']),
+                               'close': [100.0, 50.0, 110.0, 50.0, 99.0, 55.0]})
+        log_returns = calculate_returns_wide(prices)
+        self.assertEqual(list(log_returns.columns), ['A', 'B'])
+        np.testing.assert_allclose(log_returns.to_numpy(), np.log([[1.1, 1.0], [0.9, 1.1]]))
+
+    def test_trailing_nanmean_matches_rolling_mean(self):
+        values = np.arange(1.0, 21.0).reshape(10, 2)
+        values[3, 0] = np.nan
+        # shorter than the window: an expanding mean; longer: a trailing window
+        for window in (50, 4):
+            expected = pd.DataFrame(values).rolling(window, min_periods=1).mean().to_numpy()
+            np.testing.assert_allclose(trailing_nanmean(values, window), expected)
+
+    @staticmethod
+    def expected_stats(returns, periods_in_year):
+        # reference values straight from pandas, independent of the numpy implementation
+        cumulative = (1 + returns).cumprod()
+        drawdowns = cumulative / cumulative.cummax() - 1
+        demeaned = returns.where(returns != 0)
+        demeaned = demeaned - demeaned.mean()
+        ann_mean = returns.mean() * periods_in_year
+        ann_std = returns.std() * periods_in_year ** .5
+        return [ann_mean, ann_std, ann_mean / ann_std, returns.skew(), drawdowns.mean(), drawdowns.min(),
+                demeaned.quantile(0.01) / demeaned.quantile(0.3) / NORMAL_DISTR_RATIO,
+                demeaned.quantile(0.99) / demeaned.quantile(0.7) / NORMAL_DISTR_RATIO]
+
+    def test_performance_stats_instruments_matches_pandas(self):
+        rng = np.random.default_rng(0)
+        returns = pd.DataFrame(rng.normal(0, 0.01, (600, 3)), columns=['A', 'B', 'C'],
+                               index=pd.bdate_range('2020-01-01', periods=600))
+        returns.iloc[::7, 1] = 0
+        stats = performance_stats_instruments(returns)
+        self.assertEqual(list(stats.columns), STAT_NAMES)
+        for symbol in returns.columns:
+            np.testing.assert_allclose(stats.loc[symbol].to_numpy(), self.expected_stats(returns[symbol], 256))
+
+    def test_calculate_stats_at_resampled_frequency_matches_pandas(self):
+        rng = np.random.default_rng(1)
+        returns = pd.Series(rng.normal(0, 0.01, 1500), index=pd.bdate_range('2015-01-01', periods=1500))
+        for frequency, rule, periods_in_year in ((MONTH, 'ME', 12), (WEEK, '7D', 52.25)):
+            stats = calculate_stats(returns, frequency)
+            self.assertEqual(list(stats), STAT_NAMES)
+            np.testing.assert_allclose(list(stats.values()),
+                                       self.expected_stats(returns.resample(rule).sum(), periods_in_year))
+
+    def test_performance_stats_instruments_without_returns(self):
+        no_rows = pd.DataFrame(columns=['A', 'B'], index=pd.DatetimeIndex([]), dtype='float32')
+        stats = performance_stats_instruments(no_rows)
+        self.assertEqual(list(stats.index), ['A', 'B'])
+        self.assertTrue(stats.isna().all().all())
+
+        no_columns = pd.DataFrame(index=pd.bdate_range('2024-01-01', periods=5))
+        stats = performance_stats_instruments(no_columns)
+        self.assertTrue(stats.empty)
+        self.assertEqual(list(stats.columns), list(performance_stats_instruments(no_rows).columns))
+
+    def test_calculate_stats_without_returns(self):
+        stats = calculate_stats(pd.Series([], index=pd.DatetimeIndex([]), dtype='float64'))
+        self.assertTrue(all(np.isnan(value) for value in stats.values()))
+
+    def test_calculate_stats_leaves_returns_untouched(self):
+        returns = pd.Series([0.01, 0.0, -0.02, 0.0, 0.03] * 20, index=pd.bdate_range('2020-01-01', periods=100))
+        original = returns.copy()
+        calculate_stats(returns)
+        pd.testing.assert_series_equal(returns, original)
+
+    @staticmethod
+    def loaded_prices(closes):
+        """Frame shaped like load_daily_price_data from {symbol: close series}."""
+        prices = pd.concat([pd.DataFrame({'date': close.index, 'symbol': symbol,
+                                          'close': close.to_numpy('float32'), 'index_type': 'broad',
+                                          'index_category': 'equity'})
+                            for symbol, close in closes.items()], ignore_index=True)
+        for col in ('index_type', 'index_category', 'symbol'):
+            prices[col] = prices[col].astype('category')
+        return prices.sort_values(['index_type', 'index_category', 'date']).set_index(['index_type', 'index_category'])
+
+    def test_monthly_return_table(self):
+        # A starts mid November and stops mid February, B only starts in late January
+        a_dates = pd.bdate_range('2023-11-15', '2024-02-09')
+        b_dates = pd.bdate_range('2024-01-22', '2024-02-09')
+        a = pd.Series(np.linspace(100, 130, len(a_dates)), index=a_dates)
+        b = pd.Series(np.linspace(50, 40, len(b_dates)), index=b_dates)
+        monthly_logrets_table.clear()
+        self.addCleanup(monthly_logrets_table.clear)
+        with mock.patch('utils.data_processing.load_daily_price_data', return_value=self.loaded_prices({'A': a, 'B': b})):
+            monthly = monthly_logrets_table()
+        table = build_monthly_return_table(monthly).set_index(['symbol', 'year'])
+
+        self.assertEqual(list(table.index), [('A', '2023'), ('A', '2024'), ('B', '2024')])
+        self.assertEqual(list(table.columns), list(range(1, 13)) + ['ytd'])
+        a32, b32 = a.astype('float32').astype('float64'), b.astype('float32').astype('float64')
+        a_month_end = a32.groupby(a32.index.to_period('M')).last()
+        expected = {
+            ('A', '2023', 11): a_month_end['2023-11'] / a32.iloc[0],  # partial month from the first price
+            ('A', '2023', 12): a_month_end['2023-12'] / a_month_end['2023-11'],
+            ('A', '2024', 1): a_month_end['2024-01'] / a_month_end['2023-12'],
+            ('A', '2024', 2): a_month_end['2024-02'] / a_month_end['2024-01'],
+            ('B', '2024', 1): b32[:'2024-01'].iloc[-1] / b32.iloc[0],  # later inception: from its own first price
+            ('B', '2024', 2): b32.iloc[-1] / b32[:'2024-01'].iloc[-1],
+        }
+        for (symbol, year, month), ratio in expected.items():
+            self.assertAlmostEqual(table.loc[(symbol, year), month], (ratio - 1) * 100, places=6)
+        self.assertTrue(table.loc[('A', '2023'), list(range(1, 11))].isna().all())
+        self.assertTrue(table.loc[('B', '2024'), list(range(3, 13))].isna().all())
+        # ytd compounds the months rather than adding up the monthly percentages
+        self.assertAlmostEqual(table.loc[('A', '2023'), 'ytd'], (a_month_end['2023-12'] / a32.iloc[0] - 1) * 100, places=6)
+        self.assertAlmostEqual(table.loc[('B', '2024'), 'ytd'], (b32.iloc[-1] / b32.iloc[0] - 1) * 100, places=6)
+        self.assertNotAlmostEqual(table.loc[('A', '2023'), 'ytd'], table.loc[('A', '2023'), [11, 12]].sum(), places=6)
+
 
 if __name__ == '__main__':
     unittest.main()
-    
\ No newline at end of file
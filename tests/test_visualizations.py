@@ -0,0 +1,108 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.visualizations import _daily_returns_wide, downsample_minmax, plot_correlation_heatmap
+
+
+class TestVisualizations(unittest.TestCase):
+    def test_daily_returns_wide_matches_per_symbol_pct_change(self):
+        dates = pd.bdate_range('2024-01-01', periods=8)
+        rng = np.random.default_rng(0)
+        # B is missing a gap mid series and starts a day late, C only has a single price
+        prices = pd.concat([
+            pd.DataFrame({'date': dates, 'symbol': 'A', 'close': rng.uniform(90, 110, 8)}),
+            pd.DataFrame({'date': dates[[1, 2, 5, 6, 7]], 'symbol': 'B', 'close': rng.uniform(40, 60, 5)}),
+            pd.DataFrame({'date': dates[[3]], 'symbol': 'C', 'close': [10.0]}),
+        ], ignore_index=True).sample(frac=1, random_state=0)
+        prices['symbol'] = prices['symbol'].astype('category')
+
+        expected = (prices.sort_values('date')
+                    .assign(daily_return=lambda x: x.groupby('symbol', observed=True)['close'].pct_change())
+                    .dropna(subset=['daily_return'])
+                    .set_index(['date', 'symbol'])['daily_return']
+                    .sort_index())
+        returns = _daily_returns_wide(prices).stack().sort_index()
+
+        self.assertEqual(list(returns.index), list(expected.index))
+        np.testing.assert_allclose(returns.to_numpy(), expected.to_numpy())
+        # the return after B's gap is taken from its last price before the gap
+        b = prices[prices['symbol'] == 'B'].set_index('date')['close']
+        self.assertAlmostEqual(returns.loc[(dates[5], 'B')], b[dates[5]] / b[dates[2]] - 1)
+
+    @staticmethod
+    def minmax_positions(values, bucket_size):
+        """Positions of the endpoints and of each bucket's min and max, found bucket by bucket."""
+        keep = {0, len(values) - 1}
+        for start in range(0, len(values), bucket_size):
+            bucket = values[start:start + bucket_size]
+            keep.update((start + int(np.argmin(bucket)), start + int(np.argmax(bucket))))
+        return sorted(keep)
+
+    def test_downsample_minmax_leaves_short_series_unchanged(self):
+        series = pd.Series([1.0, np.nan, np.nan, 4.0, 5.0], index=pd.bdate_range('2024-01-01', periods=5))
+        pd.testing.assert_series_equal(downsample_minmax(series, n_out=5), series)
+
+    def test_downsample_minmax_keeps_extremes_and_endpoints(self):
+        rng = np.random.default_rng(0)
+        series = pd.Series(rng.normal(size=10_000).cumsum(), index=pd.bdate_range('2000-01-03', periods=10_000))
+        series.iloc[[17, 5000]] = np.nan
+        sampled = downsample_minmax(series, n_out=200)
+        # a min and a max per bucket, plus the first and last point
+        self.assertLessEqual(len(sampled), 200 + 2)
+        self.assertFalse(sampled.isna().any())
+        self.assertTrue(sampled.index.is_monotonic_increasing)
+        pd.testing.assert_series_equal(sampled, series.loc[sampled.index])
+        for label in (series.idxmin(), series.idxmax(), series.index[0], series.index[-1]):
+            self.assertIn(label, sampled.index)
+
+    def test_downsample_minmax_pads_the_last_bucket(self):
+        # 1003 points in 5 buckets of 201: the last bucket holds 199 points and 2 padding slots
+        values = np.random.default_rng(1).normal(size=1003)
+        values[-3] = -10
+        series = pd.Series(values)
+        sampled = downsample_minmax(series, n_out=10)
+        self.assertEqual(list(sampled.index), self.minmax_positions(values, 201))
+        self.assertIn(1000, sampled.index)
+        # fewer buckets than n_out / 2 when the ceil-div bucket size overshoots: 1002 points in 334 buckets of 3
+        values = np.random.default_rng(2).normal(size=1002)
+        sampled = downsample_minmax(pd.Series(values), n_out=1000)
+        self.assertEqual(list(sampled.index), self.minmax_positions(values, 3))
+
+
+    @staticmethod
+    def heatmap_z(prices, symbols):
+        z = np.asarray(plot_correlation_heatmap(prices, symbols).data[0].z, dtype=float)
+        rows, cols = np.tril_indices(len(symbols), k=-1)
+        return z, z[rows, cols], (rows, cols)
+
+    def test_correlation_heatmap_matches_dataframe_corr(self):
+        rng = np.random.default_rng(3)
+        prices = pd.DataFrame(100 * np.exp(rng.normal(0, 0.01, (300, 4)).cumsum(axis=0)),
+                              columns=['A', 'B', 'C', 'D'], index=pd.bdate_range('2020-01-01', periods=300))
+        prices['B'] = prices['B'] + 0.5 * prices['A']
+        prices.iloc[:20, 2] = np.nan
+        symbols = ['A', 'B', 'C']
+        z, lower, (rows, cols) = self.heatmap_z(prices, symbols)
+        expected = prices[symbols].pct_change(fill_method=None).dropna().corr().to_numpy()
+        np.testing.assert_allclose(lower, expected[rows, cols], atol=1e-5)
+        # the diagonal and upper triangle are left blank
+        self.assertTrue(np.isnan(z[np.triu_indices(len(symbols))]).all())
+
+    def test_correlation_heatmap_without_enough_returns(self):
+        prices = pd.DataFrame({'A': [1.0, 2.0, 3.0, 4.0], 'B': [1.0, 2.0, np.nan, 5.0]},
+                              index=pd.bdate_range('2024-01-01', periods=4))
+        # a single price gives no returns; the full frame has one date with both returns
+        for n_rows in (1, 4):
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', RuntimeWarning)
+                fig = plot_correlation_heatmap(prices.iloc[:n_rows], ['A', 'B'])
+            z = np.asarray(fig.data[0].z, dtype=float)
+            self.assertTrue(np.isnan(z).all())
+            self.assertEqual([annotation.text for annotation in fig.layout.annotations], ['nan'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,12 @@
 import boto3
+import pyarrow.parquet as pq
 from botocore.config import Config
 from botocore.exceptions import ClientError
+from pyarrow import fs
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from io import BytesIO
 from pathlib import Path
 from typing import Dict
@@ -57,6 +61,21 @@ class CloudflareR2:
             config=Config(s3={'addressing_style': 'virtual'})
         )
 
+    def create_arrow_filesystem(self):
+        """Create and return a pyarrow S3 filesystem configured for Cloudflare R2."""
+        return fs.S3FileSystem(
+            access_key=self.access_key_id,
+            secret_key=self.access_key_secret,
+            endpoint_override=f"https://{self.account_id}.r2.cloudflarestorage.com",
+            region="auto",
+            force_virtual_addressing=True
+        )
+
+    @cached_property
+    def arrow_fs(self):
+        """pyarrow filesystem used by read_parquet, created on first use since it starts the AWS SDK."""
+        return self.create_arrow_filesystem()
+
     def bucket_exists(self, bucket_name):
         """Check if a bucket exists."""
         try:
@@ -96,6 +115,37 @@ class CloudflareR2:
             else:
                 raise Exception(f"Failed to read file: {str(e)}")
 
+    def read_parquet(self, bucket_name, file_path, columns=None):
+        """
+        Read a parquet file from Cloudflare R2 storage into a DataFrame.
+        Unlike read_file, the object is not buffered in memory first: pyarrow reads
+        the footer and then only the column chunks that are requested.
+        :param bucket_name: Name of the R2 bucket
+        :param file_path: Path of the parquet file (including "folders")
+        :param columns: Columns to read. If None, all columns are read
+        :return: pandas DataFrame
+        """
+        try:
+            table = pq.read_table(f"{bucket_name}/{file_path}", columns=columns, filesystem=self.arrow_fs)
+            return table.to_pandas()
+        except FileNotFoundError:
+            raise Exception(f"File '{file_path}' does not exist in bucket '{bucket_name}'")
+        except OSError as e:
+            raise Exception(f"Failed to read parquet file: {str(e)}")
+
+    def read_files(self, bucket_name, file_paths, max_workers=8):
+        """
+        Read several files from Cloudflare R2 storage concurrently.
+        :param bucket_name: Name of the R2 bucket
+        :param file_paths: Iterable of file paths to read
+        :param max_workers: Maximum number of concurrent downloads
+        :return: Dictionary mapping each file path to its content (as returned by read_file)
+        """
+        file_paths = list(file_paths)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            contents = executor.map(lambda file_path: self.read_file(bucket_name, file_path), file_paths)
+            return dict(zip(file_paths, contents))
+
     def write_file(self, bucket_name, file_path, content, create_bucket=True):
         """
         Write a file to Cloudflare R2 storage.
@@ -124,6 +174,38 @@ class CloudflareR2:
         except ClientError as e:
             raise Exception(f"Failed to list buckets: {str(e)}")
 
+    def _list_pages(self, bucket_name, prefix='', delimiter='/'):
+        """Yield the list_objects_v2 response pages, following continuation tokens."""
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
+            Bucket=bucket_name,
+            Prefix=prefix,
+            Delimiter=delimiter,
+            PaginationConfig={'PageSize': 1000}
+        )
+        try:
+            yield from pages
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'NoSuchBucket':
+                raise Exception(f"Bucket '{bucket_name}' does not exist")
+            else:
+                raise Exception(f"Failed to list files in bucket '{bucket_name}': {str(e)}")
+
+    def list_files_iter(self, bucket_name, prefix='', delimiter='/'):
+        """
+        Lazily iterate over the files (object keys) in a bucket, optionally within a "folder".
+        Pages are fetched as the iterator is consumed, so buckets with more than
+        1000 objects are listed in full without holding every key in memory.
+        :param bucket_name: Name of the bucket to list files from
+        :param prefix: Prefix to filter objects (simulates folder path)
+        :param delimiter: Delimiter for hierarchy (default '/')
+        :return: Generator of file keys
+        """
+        for page in self._list_pages(bucket_name, prefix, delimiter):
+            for item in page.get('Contents', []):
+                if item['Key'] != prefix:
+                    yield item['Key']
+
     def list_files(self, bucket_name, prefix='', delimiter='/'):
         """
         List all files (objects) in a specific bucket, optionally within a "folder".
@@ -132,35 +214,16 @@ class CloudflareR2:
         :param delimiter: Delimiter for hierarchy (default '/')
         :return: Dictionary containing files and subfolders
         """
-        try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=bucket_name,
-                Prefix=prefix,
-                Delimiter=delimiter
-            )
-            
-            result = {
-                'files': [],
-                'folders': []
-            }
-
-            if 'Contents' in response:
-                # result['files'] = [{
-                #     'Key': item['Key'],
-                #     'Size': item['Size'],
-                #     'LastModified': item['LastModified'].isoformat()
-                # } for item in response['Contents'] if item['Key'] != prefix]
-                result['files'] = [item['Key'] for item in response['Contents'] if item['Key'] != prefix]
-            
-            if 'CommonPrefixes' in response:
-                result['folders'] = [prefix['Prefix'] for prefix in response['CommonPrefixes']]
-
-            return result
-        except ClientError as e:
-            if e.response['Error']['Code'] == 'NoSuchBucket':
-                raise Exception(f"Bucket '{bucket_name}' does not exist")
-            else:
-                raise Exception(f"Failed to list files in bucket '{bucket_name}': {str(e)}")
+        result = {
+            'files': [],
+            'folders': []
+        }
+
+        for page in self._list_pages(bucket_name, prefix, delimiter):
+            result['files'].extend(item['Key'] for item in page.get('Contents', []) if item['Key'] != prefix)
+            result['folders'].extend(common_prefix['Prefix'] for common_prefix in page.get('CommonPrefixes', []))
+
+        return result
 
     def list_folder_contents(self, bucket_name, folder_path):
         """
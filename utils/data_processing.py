@@ -1,12 +1,19 @@
 import pandas as pd
 import numpy as np
+import streamlit as st
 from enum import Enum
+from functools import lru_cache
 from scipy.stats import norm
 from deltalake import DeltaTable
 from utils.cloudstorage import get_storage_options
 
 DATAPATH = 's3://financial-data-store/bronze/nseindex/daily_price_nifty_indices/'
 RATIODATAPATH = 's3://financial-data-store/bronze/nseindex/daily_ratios_nifty_indices/'
+# only these columns are read from the delta tables; the rest are never downloaded
+PRICE_COLUMNS = ['index_type', 'index_category', 'symbol', 'date', 'close']
+RATIO_COLUMNS = ['symbol', 'date', 'pe', 'pb', 'dividend_yield']
+# prices are held as float32: plenty for index levels and halves the bytes every pivot/rolling pass moves
+PRICE_VALUE_COLUMNS = ['close']
 QUANT_PERCENTILE_EXTREME = 0.01
 QUANT_PERCENTILE_STD = 0.3
 NORMAL_DISTR_RATIO = norm.ppf(QUANT_PERCENTILE_EXTREME) / norm.ppf(QUANT_PERCENTILE_STD)
@@ -14,6 +21,8 @@ BUSINESS_DAYS_IN_YEAR = 256
 WEEKS_PER_YEAR = 52.25
 MONTHS_PER_YEAR = 12
 SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+# loaded frames are shared by every session; reload periodically to pick up new daily data
+DATA_CACHE_TTL = '6h'
 
 Frequency = Enum(
     "Frequency",
@@ -32,68 +41,70 @@ PERIODS_PER_YEAR = {
 
 }
 
-def load_daily_price_data(path=DATAPATH):
-    daily_index_price = DeltaTable(path, storage_options=get_storage_options()).to_pandas()
-    return daily_index_price
-
-def load_daily_ratio_data(path=RATIODATAPATH):
-    daily_index_price = DeltaTable(path, storage_options=get_storage_options()).to_pandas()
-    return daily_index_price
-
-def robust_vol(
-    daily_returns:pd.Series,
-    annualise_stdev: bool = False,
-    BUSINESS_DAYS_IN_YEAR = 256
-) -> pd.Series:
+# square roots of the periods per year, to annualise standard deviations
+SQRT_PERIODS_PER_YEAR = {
+    NATURAL: BUSINESS_DAYS_IN_YEAR ** .5,
+    **{frequency: periods ** .5 for frequency, periods in PERIODS_PER_YEAR.items()}
+}
 
-    ## Can do the whole series or recent history
-    daily_exp_std_dev = daily_returns.ewm(span=32).std()
+# pandas resample rules; 'YE'/'ME' replace the deprecated 'Y'/'M' aliases
+RESAMPLE_RULES = {
+    YEAR: "YE",
+    WEEK: "7D",
+    MONTH: "ME"
+}
 
-    if annualise_stdev:
-        annualisation_factor = BUSINESS_DAYS_IN_YEAR ** 0.5
-    else:
-        ## leave at daily
-        annualisation_factor = 1
+@lru_cache(maxsize=None)
+def _delta_table(path):
+    # the handle keeps the table's log loaded, so a cache refresh only has to fetch new commits
+    return DeltaTable(path, storage_options=get_storage_options())
+
+def read_delta_columns(path, columns):
+    """Reads only the given columns of the latest version of the Delta table at path."""
+    delta_table = _delta_table(path)
+    delta_table.update_incremental()
+    table = delta_table.to_pyarrow_dataset().to_table(columns=columns)
+    # the arrow table is not used afterwards, let pandas take over its buffers column by column
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+# Loaded once per process and shared across pages and sessions. Callers must not
+# mutate the returned frames in place; take a .copy() first if needed.
+@st.cache_resource(show_spinner=False, ttl=DATA_CACHE_TTL)
+def load_daily_price_data(path=DATAPATH):
+    daily_index_price = read_delta_columns(path, PRICE_COLUMNS)
+    for col in ('index_type', 'index_category', 'symbol'):
+        daily_index_price[col] = daily_index_price[col].astype('category')
+    daily_index_price[PRICE_VALUE_COLUMNS] = daily_index_price[PRICE_VALUE_COLUMNS].astype('float32')
+    # sorted (index_type, index_category) index so filters are range slices, not full scans
+    daily_index_price = (daily_index_price
+                         .sort_values(['index_type', 'index_category', 'date'])
+                         .set_index(['index_type', 'index_category']))
+    return daily_index_price
 
-    annualised_std_dev = daily_exp_std_dev * annualisation_factor
+@st.cache_resource(show_spinner=False, ttl=DATA_CACHE_TTL)
+def index_type_to_symbols():
+    """Symbols available for each index type, built once per data load for the sidebar options."""
+    symbols = load_daily_price_data().groupby(level='index_type', observed=True)['symbol'].unique()
+    return {index_type: np.asarray(index_symbols) for index_type, index_symbols in symbols.items()}
 
-    ## Weight with ten year vol
-    ten_year_vol = annualised_std_dev.rolling(
-        BUSINESS_DAYS_IN_YEAR * 10, min_periods=1
-    ).mean()
-    weighted_vol = 0.3 * ten_year_vol + 0.7 * annualised_std_dev
+def get_index_types():
+    return list(index_type_to_symbols())
 
-    return weighted_vol
+def get_symbols_for(index_type):
+    return index_type_to_symbols().get(index_type, np.array([], dtype=object))
 
+@st.cache_resource(show_spinner=False, ttl=DATA_CACHE_TTL)
+def load_daily_ratio_data(path=RATIODATAPATH):
+    daily_index_price = read_delta_columns(path, RATIO_COLUMNS)
+    daily_index_price['symbol'] = daily_index_price['symbol'].astype('category')
+    return daily_index_price
 
 def calculate_stats(perc_return: pd.Series,
                 at_frequency: Frequency = NATURAL) -> dict:
 
     perc_return_at_freq = sum_at_frequency(perc_return, at_frequency=at_frequency)
 
-    ann_mean = ann_mean_given_frequency(perc_return_at_freq, at_frequency=at_frequency)
-    ann_median = ann_median_given_frequency(perc_return_at_freq, at_frequency=at_frequency)
-    ann_std = ann_std_given_frequency(perc_return_at_freq, at_frequency=at_frequency)
-    sharpe_ratio = ann_mean / ann_std
-
-    skew_at_freq = perc_return_at_freq.skew()
-    drawdowns = calculate_drawdown(perc_return_at_freq)
-    avg_drawdown = drawdowns.mean()
-    max_drawdown = drawdowns.min()
-    quant_ratio_lower = calculate_quant_ratio_lower(perc_return_at_freq)
-    quant_ratio_upper = calculate_quant_ratio_upper(perc_return_at_freq)
-
-    return dict(
-        ann_mean = ann_mean,
-       # ann_median = ann_median,
-        ann_std = ann_std,
-        sharpe_ratio = sharpe_ratio,
-        skew = skew_at_freq,
-        avg_drawdown = avg_drawdown,
-        max_drawdown = max_drawdown,
-        quant_ratio_lower = quant_ratio_lower,
-        quant_ratio_upper = quant_ratio_upper
-    )
+    return _return_stats(perc_return_at_freq.to_numpy(dtype='float64'), at_frequency)
 
 
 
@@ -117,11 +128,7 @@ def sum_at_frequency(perc_return: pd.Series,
     if at_frequency == NATURAL:
         return perc_return
 
-    at_frequency_str_dict = {
-                        YEAR: "Y",
-                        WEEK: "7D",
-                        MONTH: "1M"}
-    at_frequency_str = at_frequency_str_dict[at_frequency]
+    at_frequency_str = RESAMPLE_RULES[at_frequency]
 
     perc_return_at_freq = perc_return.resample(at_frequency_str).sum()
 
@@ -150,36 +157,58 @@ def ann_std_given_frequency(perc_return_at_freq: pd.Series,
                              at_frequency: Frequency) -> float:
 
     std_at_frequency = perc_return_at_freq.std()
-    periods_per_year_for_frequency = periods_per_year(at_frequency)
-    annualised_std = std_at_frequency * (periods_per_year_for_frequency**.5)
+    annualised_std = std_at_frequency * SQRT_PERIODS_PER_YEAR[at_frequency]
 
     return annualised_std
 
 
 def calculate_drawdown(perc_return):
-    cum_perc_return = perc_return.apply(np.log1p).cumsum().apply(np.exp)
-    max_cum_perc_return = cum_perc_return.rolling(len(perc_return)+1,
-                                                  min_periods=1).max()
-    return cum_perc_return/max_cum_perc_return-1
+    return pd.Series(_drawdowns(perc_return.to_numpy(dtype='float64')), index=perc_return.index)
+
+def _drawdowns(arr):
+    ## drawdown from the running peak along axis 0, NaN returns are skipped and stay NaN
+    missing = np.isnan(arr)
+    cum_perc_return = np.exp(np.cumsum(np.where(missing, 0, np.log1p(arr)), axis=0))
+    cum_perc_return[missing] = np.nan
+    # fmax skips the NaNs, so the peak only runs over observed values
+    return cum_perc_return / np.fmax.accumulate(cum_perc_return, axis=0) - 1
 
 
 def calculate_quant_ratio_lower(x):
-    x_dm = demeaned_remove_zeros(x)
-    raw_ratio = x_dm.quantile(QUANT_PERCENTILE_EXTREME) / x_dm.quantile(
-        QUANT_PERCENTILE_STD
-    )
-    return raw_ratio / NORMAL_DISTR_RATIO
+    return _quant_ratios(x.to_numpy(dtype='float64'))[0]
 
 def calculate_quant_ratio_upper(x):
-    x_dm = demeaned_remove_zeros(x)
-    raw_ratio = x_dm.quantile(1 - QUANT_PERCENTILE_EXTREME) / x_dm.quantile(
-        1 - QUANT_PERCENTILE_STD
-    )
-    return raw_ratio / NORMAL_DISTR_RATIO
-
-def demeaned_remove_zeros(x):
-    x[x == 0] = np.nan
-    return x - x.mean()
+    return _quant_ratios(x.to_numpy(dtype='float64'))[1]
+
+def demeaned_remove_zeros(arr):
+    ## zeros masked as NaN, then demeaned along axis 0; works on a copy, arr is not modified
+    x_dm = np.where(arr == 0, np.nan, arr)
+    x_dm -= np.nanmean(x_dm, axis=0)
+    return x_dm
+
+def _nanquantiles(arr, quantiles):
+    ## linear interpolated quantiles of the non-NaN values along axis 0, like np.nanquantile
+    ## but from one sort of the whole array: np.nanquantile falls back to a per column loop once there are NaNs
+    if arr.shape[0] == 0:
+        return np.full((len(quantiles),) + arr.shape[1:], np.nan)
+    sorted_arr = np.sort(arr, axis=0)  # NaNs sort to the end
+    n = np.sum(~np.isnan(arr), axis=0)
+    position = np.multiply.outer(np.asarray(quantiles), np.maximum(n - 1, 0))
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(n - 1, 0))
+    weight = position - lower
+    below = np.take_along_axis(sorted_arr, lower, axis=0)
+    above = np.take_along_axis(sorted_arr, upper, axis=0)
+    return np.where(n > 0, below + (above - below) * weight, np.nan)
+
+def _quant_ratios(arr):
+    ## lower and upper quant ratios along axis 0, from a single quantile call; arr is not modified
+    x_dm = demeaned_remove_zeros(arr)
+    q_low_extreme, q_low_std, q_high_std, q_high_extreme = _nanquantiles(
+        x_dm,
+        [QUANT_PERCENTILE_EXTREME, QUANT_PERCENTILE_STD, 1 - QUANT_PERCENTILE_STD, 1 - QUANT_PERCENTILE_EXTREME])
+    return (q_low_extreme / q_low_std / NORMAL_DISTR_RATIO,
+            q_high_extreme / q_high_std / NORMAL_DISTR_RATIO)
 
 
 def performance_stats_df(perc_return, at_frequency=NATURAL):
@@ -191,30 +220,56 @@ def performance_stats_df(perc_return, at_frequency=NATURAL):
 
     return df
 
-def calculate_returns_wide(df,kind = 'log', resample=None,dropna=True):
-    log_returns = df.drop(['index_name','index_type','index_category'], axis=1).set_index(['symbol', 'date'])[['close']].unstack(0).droplevel(0, axis=1).apply(np.log).diff()
-    if dropna:
-        log_returns = log_returns.dropna()
-    if resample:
-        log_returns = log_returns.resample(resample).sum()
-        
-    if kind == 'log':
-        return log_returns
-    else:
-        return np.expm1(log_returns)
-    
+def _nanskew(arr):
+    ## bias corrected sample skew per column, same estimator as pd.Series.skew
+    n = np.sum(~np.isnan(arr), axis=0)
+    dm = arr - np.nanmean(arr, axis=0)
+    m2 = np.nanmean(dm ** 2, axis=0)
+    m3 = np.nanmean(dm ** 3, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        skew = np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5
+    return np.where(n < 3, np.nan, np.where(m2 == 0, 0, skew))
+
+def _return_stats(arr, at_frequency):
+    ## stats of calculate_stats along axis 0 of a float64 array of returns at at_frequency;
+    ## a 1d array gives scalars, a (dates x instruments) array one value per instrument
+    if arr.size == 0:
+        # no returns (or no instruments): NaN for every stat, like the pandas reductions give;
+        # [()] turns the 0-d array of a 1d input into a scalar
+        no_stat = np.full(arr.shape[1:], np.nan)[()]
+        return dict.fromkeys(['ann_mean', 'ann_std', 'sharpe_ratio', 'skew', 'avg_drawdown', 'max_drawdown',
+                              'quant_ratio_lower', 'quant_ratio_upper'], no_stat)
+    ann_mean = np.nanmean(arr, axis=0) * periods_per_year(at_frequency)
+    ann_std = np.nanstd(arr, axis=0, ddof=1) * SQRT_PERIODS_PER_YEAR[at_frequency]
+    drawdowns = _drawdowns(arr)
+    quant_ratio_lower, quant_ratio_upper = _quant_ratios(arr)
+
+    return dict(
+        ann_mean = ann_mean,
+        ann_std = ann_std,
+        sharpe_ratio = ann_mean / ann_std,
+        skew = _nanskew(arr),
+        avg_drawdown = np.nanmean(drawdowns, axis=0),
+        max_drawdown = np.nanmin(drawdowns, axis=0),
+        quant_ratio_lower = quant_ratio_lower,
+        quant_ratio_upper = quant_ratio_upper
+    )
+
 def performance_stats_instruments(df):
-    stats_df = pd.DataFrame()
-    for c in df.columns:
-        stats_df[c] = performance_stats_df(df[c])[['stats']]
-    return stats_df.T
+    """
+    Same stats as performance_stats_df at the natural frequency, for every column of a
+    wide returns frame at once. Returns one row per instrument.
+    """
+    # returns may arrive as float32; the reported stats are computed in float64
+    return pd.DataFrame(_return_stats(df.to_numpy(dtype='float64'), NATURAL), index=df.columns)
 
 def robust_vol(
-    daily_returns:pd.Series,
+    daily_returns:pd.Series | pd.DataFrame,
     annualise_stdev: bool = False,
     BUSINESS_DAYS_IN_YEAR = 256
-) -> pd.Series:
+) -> pd.Series | pd.DataFrame:
 
+    ## Works column-wise on a wide frame in one call, no need to .apply per column
     ## Can do the whole series or recent history
     daily_exp_std_dev = daily_returns.ewm(span=32).std()
 
@@ -227,17 +282,38 @@ def robust_vol(
     annualised_std_dev = daily_exp_std_dev * annualisation_factor
 
     ## Weight with ten year vol
-    ten_year_vol = annualised_std_dev.rolling(
-        BUSINESS_DAYS_IN_YEAR * 10, min_periods=1
-    ).mean()
+    ten_year_vol = trailing_nanmean(annualised_std_dev.to_numpy(dtype='float64'), BUSINESS_DAYS_IN_YEAR * 10)
     weighted_vol = 0.3 * ten_year_vol + 0.7 * annualised_std_dev
 
     return weighted_vol
 
+def trailing_nanmean(values, window):
+    """
+    Mean of the non-NaN values in the trailing window along axis 0, same as
+    rolling(window, min_periods=1).mean(), from two cumulative sums.
+    """
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
 def calculate_returns_wide(df,kind = 'log', resample=None,dropna=True, close_col = 'close'):
-    log_returns = df.drop(['index_name'], axis=1).set_index(['symbol', 'date'])[[close_col]].unstack(0).droplevel(0, axis=1).apply(np.log).diff()
+    prices = create_wide_price_df(df, close_col)
+    # log and diff on the ndarray: one array for the log prices, and the differences are
+    # written straight into the output, instead of one intermediate frame per step
+    log_prices = np.log(prices.to_numpy())
+    returns = np.empty_like(log_prices)
+    returns[:1] = np.nan
+    np.subtract(log_prices[1:], log_prices[:-1], out=returns[1:])
+    dates = prices.index
     if dropna:
-        log_returns = log_returns.dropna()
+        # drop incomplete rows on the ndarray, so only the kept rows are wrapped in a frame
+        complete = ~np.isnan(returns).any(axis=1)
+        returns, dates = returns[complete], dates[complete]
+    log_returns = pd.DataFrame(returns, index=dates, columns=prices.columns)
     if resample:
         log_returns = log_returns.resample(resample).sum()
         
@@ -247,5 +323,87 @@ def calculate_returns_wide(df,kind = 'log', resample=None,dropna=True, close_col
         return np.expm1(log_returns)
     
 def create_wide_price_df(df, val_col = 'close'):
-    analysis_df = df[['symbol',val_col,'date']].set_index(['date','symbol']).unstack(1).droplevel(0, axis=1).sort_index()
-    return analysis_df
\ No newline at end of file
+    # a single value column pivot: no column MultiIndex to droplevel, and a categorical
+    # symbol is used through its codes rather than re-hashing the strings
+    analysis_df = df.pivot(index='date', columns='symbol', values=val_col).sort_index()
+    return analysis_df
+
+def date_mask(dates, start_date=None, end_date=None):
+    """Boolean mask for start_date <= dates <= end_date (both inclusive, by calendar day)."""
+    dates = np.asarray(dates)
+    mask = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        mask &= dates >= np.datetime64(start_date)
+    if end_date is not None:
+        mask &= dates < np.datetime64(end_date) + np.timedelta64(1, 'D')
+    return mask
+
+def symbol_mask(symbols, selected):
+    """Boolean mask for rows of a categorical symbol column that are in selected, matched on the category codes."""
+    codes = symbols.cat.categories.get_indexer(selected)
+    return np.isin(symbols.cat.codes.to_numpy(), codes[codes >= 0])
+
+def filter_index_data(df, index_type, index_category=None, start_date=None, end_date=None):
+    key = index_type if index_category is None else (index_type, index_category)
+    if key not in df.index:
+        return df.iloc[:0]
+    filtered_df = df.xs(key, drop_level=False)
+    # the returns plots pass no dates: skip the full-length mask and the copy it makes
+    if start_date is not None or end_date is not None:
+        filtered_df = filtered_df[date_mask(filtered_df['date'].values, start_date, end_date)]
+    return filtered_df.assign(symbol=filtered_df['symbol'].cat.remove_unused_categories())
+
+@st.cache_resource(show_spinner=False, ttl=DATA_CACHE_TTL)
+def monthly_logrets_table():
+    """
+    Tidy (index_type, symbol, year, month, logret) table of monthly log returns over
+    the full history, built once per data load. Each symbol uses its own history, so
+    indices with a shorter history don't truncate the others.
+    """
+    prices = load_daily_price_data()
+    index_type = prices.index.get_level_values('index_type')
+    # frame is sorted by date within each (index_type, symbol), so a grouped diff is a plain daily log return
+    log_returns = np.log(prices['close'].astype('float64')).groupby([index_type, prices['symbol']], observed=True).diff()
+    dates = pd.DatetimeIndex(prices['date'])
+    return (pd.DataFrame({'index_type': index_type, 'symbol': prices['symbol'].values,
+                          'year': dates.year, 'month': dates.month, 'logret': log_returns.values})
+            .groupby(['index_type', 'symbol', 'year', 'month'], observed=True)['logret']
+            .sum(min_count=1)
+            .reset_index()
+    )
+
+def build_monthly_return_table(monthly_log_returns):
+    """Monthly compounded returns (in %) per symbol and year, with a ytd column, from a slice of monthly_logrets_table."""
+    return (monthly_log_returns
+            .assign(year = lambda x: x.year.astype('str'))
+            .pivot(index=['symbol', 'year'], columns='month', values='logret')
+            .reindex(columns=pd.Index(range(1, 13), name='month'))
+            .assign(ytd = lambda x:x.sum(axis=1))
+            .pipe(np.expm1)
+            .mul(100)
+            .reset_index()
+    )
+
+# Cached variants keyed on the sidebar filter values, so that reruns triggered by
+# unrelated widgets reuse the pivots instead of recomputing them from the full frame.
+
+@st.cache_data(max_entries=32, ttl=DATA_CACHE_TTL, show_spinner=False)
+def calculate_returns_wide_cached(index_type, index_category, start_date, end_date, resample=None):
+    filtered_df = filter_index_data(load_daily_price_data(), index_type, index_category, start_date, end_date)
+    return calculate_returns_wide(filtered_df, resample=resample)
+
+@st.cache_data(max_entries=32, ttl=DATA_CACHE_TTL, show_spinner=False)
+def robust_vol_cached(index_type, index_category, start_date, end_date, resample=None):
+    log_returns = calculate_returns_wide_cached(index_type, index_category, start_date, end_date, resample=resample)
+    return robust_vol(log_returns)
+
+@st.cache_data(max_entries=32, ttl=DATA_CACHE_TTL, show_spinner=False)
+def performance_stats_cached(index_type, index_category, start_date, end_date):
+    # simple returns are expm1 of the log returns, so reuse the cached log pivot
+    log_returns = calculate_returns_wide_cached(index_type, index_category, start_date, end_date)
+    return performance_stats_instruments(np.expm1(log_returns))
+
+@st.cache_data(max_entries=32, ttl=DATA_CACHE_TTL, show_spinner=False)
+def create_wide_price_df_cached(index_type, index_category, start_date, end_date, val_col='close'):
+    filtered_df = filter_index_data(load_daily_price_data(), index_type, index_category, start_date, end_date)
+    return create_wide_price_df(filtered_df, val_col)
@@ -4,28 +4,65 @@ import matplotlib
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from typing import List
-from utils.data_processing import robust_vol
+from utils.data_processing import robust_vol, create_wide_price_df, filter_index_data
 
+MAX_POINTS_PER_TRACE = 2000
+
+
+def downsample_minmax(series: pd.Series, n_out: int = MAX_POINTS_PER_TRACE) -> pd.Series:
+    """
+    Reduce a series to roughly n_out points for plotting.
+
+    The series is split into n_out/2 equal buckets and the minimum and maximum
+    of each bucket are kept (plus the first and last point), so peaks and
+    troughs such as drawdown lows survive the decimation. Short series are
+    returned unchanged, NaN gaps included, so the lines still break there.
+    """
+    if len(series) <= n_out:
+        return series
+
+    series = series.dropna()
+    n = len(series)
+    if n <= n_out:
+        return series
+
+    bucket_size = -(-n // (n_out // 2))
+    n_buckets = -(-n // bucket_size)
+    values = np.full(n_buckets * bucket_size, np.nan)
+    values[:n] = series.to_numpy(dtype=float)
+    values = values.reshape(n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets) * bucket_size
+    keep = np.concatenate([[0, n - 1],
+                           offsets + np.nanargmin(values, axis=1),
+                           offsets + np.nanargmax(values, axis=1)])
+    return series.iloc[np.unique(keep)]
+
+
+def _daily_returns_wide(filtered_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily simple returns as a date x symbol frame.
+
+    Each symbol's return is taken from its own previous price, as a per-symbol
+    pct_change would: prices are carried forward over dates a symbol is missing,
+    and those dates are masked out again afterwards.
+    """
+    prices = create_wide_price_df(filtered_df)
+    return prices.ffill().pct_change(fill_method=None).where(prices.notna())
 
 
 def plot_index_returns_histograms(df, index_type, category):
-    # Filter the dataframe based on index_type and category
-    filtered_df = df[(df['index_type'] == index_type) & (df['index_category'] == category)]
+    # Filter the dataframe based on index_type and category (a slice of the sorted index)
+    filtered_df = filter_index_data(df, index_type, category)
     
     if filtered_df.empty:
         return go.Figure().add_annotation(text="No data found", showarrow=False, font=dict(size=20))
     
-    # Sort the dataframe by date
-    filtered_df = filtered_df.sort_values('date')
-    
     # Calculate daily returns
-    filtered_df['daily_return'] = filtered_df.groupby('symbol')['close'].pct_change()
+    daily_returns = _daily_returns_wide(filtered_df)
     
-    # Remove rows with NaN values (first row for each symbol)
-    filtered_df = filtered_df.dropna(subset=['daily_return'])
-    
-    # Get unique symbols
-    symbols = filtered_df['symbol'].unique()
+    # Symbols with at least one return
+    symbols = daily_returns.columns[daily_returns.notna().any()].to_list()
     
     if len(symbols) == 0:
         return go.Figure().add_annotation(text="No valid data found", showarrow=False, font=dict(size=20))
@@ -41,28 +78,25 @@ def plot_index_returns_histograms(df, index_type, category):
                         vertical_spacing=0.1,
                         horizontal_spacing=0.05)
     
-    # Plot histograms for each symbol
+    # Plot histograms for each symbol: binned here with numpy, so the figure carries
+    # 50 bar heights per symbol instead of every daily return for plotly to bin
+    traces, rows, cols = [], [], []
     for i, symbol in enumerate(symbols):
-        symbol_data = filtered_df[filtered_df['symbol'] == symbol]
-        
-        row = i // n_cols + 1
-        col = i % n_cols + 1
-        
-        # Add histogram
-        fig.add_trace(
-            go.Histogram(x=symbol_data['daily_return'], 
-                         name=symbol,
-                         nbinsx=50,
-                         opacity=0.7),
-            row=row, col=col
-        )
-        
-        # Update axes
-        fig.update_xaxes(title_text="Daily Return", 
-                         row=row, col=col, 
-                         tickformat='.1%',
-                         hoverformat='.2%')
-        fig.update_yaxes(title_text="Frequency", row=row, col=col)
+        counts, edges = np.histogram(daily_returns[symbol].dropna().to_numpy(), bins=50)
+        traces.append(go.Bar(x=(edges[:-1] + edges[1:]) / 2,
+                             y=counts,
+                             width=np.diff(edges),
+                             name=symbol,
+                             opacity=0.7))
+        rows.append(i // n_cols + 1)
+        cols.append(i % n_cols + 1)
+    fig.add_traces(traces, rows=rows, cols=cols)
+    
+    # Update axes
+    fig.update_xaxes(title_text="Daily Return", 
+                     tickformat='.1%',
+                     hoverformat='.2%')
+    fig.update_yaxes(title_text="Frequency")
     
     # Update layout
     fig.update_layout(
@@ -75,20 +109,14 @@ def plot_index_returns_histograms(df, index_type, category):
     return fig
 
 def plot_index_returns_boxplots(df, index_type, category):
-    # Filter the dataframe based on index_type and category
-    filtered_df = df[(df['index_type'] == index_type) & (df['index_category'] == category)]
+    # Filter the dataframe based on index_type and category (a slice of the sorted index)
+    filtered_df = filter_index_data(df, index_type, category)
     
     if filtered_df.empty:
         return go.Figure().add_annotation(text="No data found", showarrow=False, font=dict(size=20))
     
-    # Sort the dataframe by date
-    filtered_df = filtered_df.sort_values('date')
-    
-    # Calculate daily returns
-    filtered_df['daily_return'] = filtered_df.groupby('symbol')['close'].pct_change()
-    
-    # Remove rows with NaN values (first row for each symbol)
-    filtered_df = filtered_df.dropna(subset=['daily_return'])
+    # Calculate daily returns, long format only for plotly
+    filtered_df = _daily_returns_wide(filtered_df).melt(value_name='daily_return').dropna(subset=['daily_return'])
     
     if filtered_df.empty:
         return go.Figure().add_annotation(text="No valid data found", showarrow=False, font=dict(size=20))
@@ -130,20 +158,13 @@ def plot_index_returns_boxplots(df, index_type, category):
     return fig
 
 
-def plot_performance(zscore_change_df: pd.DataFrame, n_periods: int,chart_title:str,x_axis_title:str, data_zscored = True) -> go.Figure:
+def _add_performance_row(fig: go.Figure, zscore_change_df: pd.DataFrame, n_periods: int, row: int,
+                         x_axis_title: str, data_zscored: bool = True) -> None:
     """
-    Plots the performance of NIFTY indices based on the z-score changes.
-
-    Parameters:
-    - zscore_change_df: pd.DataFrame containing z-score changes.
-
-    Returns:
-    - go.Figure: Plotly figure object.
+    Adds one bar chart per period (latest first) of the last n_periods to the given row of fig.
     """
-    # Create subplots
     df = zscore_change_df.iloc[-n_periods:].sort_index(ascending=False).T
     df.columns = df.columns.strftime('%Y-%m-%d')
-    fig = make_subplots(rows=1, cols=len(df.columns), subplot_titles=df.columns, shared_yaxes=True, shared_xaxes=True)
 
     # Add traces for each column
     for i, column in enumerate(df.columns, 1):
@@ -166,35 +187,55 @@ def plot_performance(zscore_change_df: pd.DataFrame, n_periods: int,chart_title:
                 textposition='outside',
                 orientation='h'
             ),
-            row=1, col=i
+            row=row, col=i
         )
 
         # Add vertical lines
         if data_zscored:
             for x in [-2, -1, 1, 2]:
-                fig.add_vline(x=x, line_width=1, line_dash="dash", line_color="gray", row=1, col=i)
+                fig.add_vline(x=x, line_width=1, line_dash="dash", line_color="gray", row=row, col=i)
         x_min = min(column_data.values.min(), -2 if data_zscored else -0.02)
         x_max = max(column_data.values.max(), 2 if data_zscored else 0.02)
         x_range = x_max - x_min
         x_padding = 0.1 * x_range  # 10% padding
-        fig.update_xaxes(range=[x_min - x_padding, x_max + x_padding], row=1, col=i)
+        fig.update_xaxes(range=[x_min - x_padding, x_max + x_padding], row=row, col=i)
 
-    # Update layout
-    fig.update_layout(
-        height=750,
-        width=600 * len(df.columns),  # Adjust width based on number of columns
-        title_text=chart_title,
-        showlegend=False,
-        barmode='group',
-    )
-    
     if data_zscored:
         tickformat = '.0f'
     else:
-        tickformat = '.0%'   
+        tickformat = '.0%'
 
     # Update x-axes
-    fig.update_xaxes(title_text=x_axis_title, tickformat=tickformat)
+    fig.update_xaxes(title_text=x_axis_title, tickformat=tickformat, row=row)
+
+
+def plot_index_movements(zscore_df: pd.DataFrame, returns_df: pd.DataFrame, vol_df: pd.DataFrame,
+                         n_periods: int) -> go.Figure:
+    """
+    Z-score, return and volatility bars of the last n_periods in a single figure.
+
+    One row per measure and one column per period, so the page ships one figure
+    instead of three. The frames are expected to share the same period index.
+
+    Returns:
+    - go.Figure: Plotly figure object.
+    """
+    periods = zscore_df.index[-n_periods:].sort_values(ascending=False).strftime('%Y-%m-%d')
+    # only the symbol (y) axes are shared along a row; every subplot keeps its own x range
+    fig = make_subplots(rows=3, cols=len(periods), subplot_titles=list(periods), shared_yaxes=True,
+                        row_titles=['Zscore', 'Return', 'Volatility'], vertical_spacing=0.05)
+
+    _add_performance_row(fig, zscore_df, n_periods, 1, 'Zscore')
+    _add_performance_row(fig, returns_df, n_periods, 2, 'Return', data_zscored=False)
+    _add_performance_row(fig, vol_df, n_periods, 3, 'Volatility', data_zscored=False)
+
+    fig.update_layout(
+        height=400 * 3,
+        width=600 * len(periods),  # Adjust width based on number of columns
+        title_text='Index Zscore, Return and Vol Performance',
+        showlegend=False,
+        barmode='group',
+    )
 
     # Update y-axes
     fig.update_yaxes(autorange="reversed")  # To maintain consistent order across subplots
@@ -238,34 +279,41 @@ def plot_index_deepdive(index_data: pd.DataFrame, selected_symbols: List[str]) -
 
     colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
     index_data = index_data[selected_symbols].dropna()
+    # rows are already aligned across symbols, so every panel is computed for all of them at once
+    returns = index_data.pct_change(fill_method=None)
+    all_nav = (1 + returns).cumprod() * 100  # Rebased to 100
+    all_drawdown = (all_nav / all_nav.cummax()) - 1
+    all_volatility = robust_vol(returns, annualise_stdev=True)
     for i, symbol in enumerate(selected_symbols):
         if symbol not in index_data.columns:
             continue
 
         color = colors[i % len(colors)]
-        symbol_data = index_data[symbol].dropna()
         
-        # Calculate returns and cumulative NAV
-        returns = symbol_data.pct_change()
-        cumulative_nav = (1 + returns).cumprod() * 100  # Rebased to 100
+        cumulative_nav = all_nav[symbol]
+        drawdown = all_drawdown[symbol]
+        volatility = all_volatility[symbol]
+
+        # Decimate after computing on the full history, so drawdowns and vol are exact
+        cumulative_nav = downsample_minmax(cumulative_nav)
+        drawdown = downsample_minmax(drawdown)
+        volatility = downsample_minmax(volatility)
 
         # Cumulative NAV time series
-        fig.add_trace(go.Scatter(x=cumulative_nav.index, y=cumulative_nav, 
+        fig.add_trace(go.Scattergl(x=cumulative_nav.index, y=cumulative_nav, 
                                  mode='lines', name=symbol,
                                  line=dict(color=color, width=2)),
                       row=1, col=1)
 
         # Underwater drawdown plot
-        drawdown = (cumulative_nav / cumulative_nav.cummax()) - 1
-        fig.add_trace(go.Scatter(x=drawdown.index, y=drawdown, 
+        fig.add_trace(go.Scattergl(x=drawdown.index, y=drawdown, 
                                  mode='lines', name=symbol,
                                  line=dict(color=color, width=2),
                                  showlegend=False),
                       row=2, col=1)
 
         # Volatility time series
-        volatility = robust_vol(returns, annualise_stdev=True)
-        fig.add_trace(go.Scatter(x=volatility.index, y=volatility, 
+        fig.add_trace(go.Scattergl(x=volatility.index, y=volatility, 
                                  mode='lines', name=symbol,
                                  line=dict(color=color, width=2),
                                  showlegend=False),
@@ -335,26 +383,29 @@ def plot_financial_ratios(df, symbols=None):
 
     # Plot data for each symbol
     for i, symbol in enumerate(symbols):
-        symbol_data = df_filtered[df_filtered['symbol'] == symbol].sort_values('date')
+        symbol_data = df_filtered[df_filtered['symbol'] == symbol].sort_values('date').set_index('date')
+        pe = downsample_minmax(symbol_data['pe'])
+        pb = downsample_minmax(symbol_data['pb'])
+        dividend_yield = downsample_minmax(symbol_data['dividend_yield'])
         color = colors[i % len(colors)]  # Cycle through colors if more symbols than colors
 
         # Common hover template
         hovertemplate = f"Symbol: {symbol}<br>Date: %{{x}}<br>Value: %{{y:.2f}}<extra></extra>"
 
         # PE Ratio
-        fig.add_trace(go.Scatter(x=symbol_data['date'], y=symbol_data['pe'],
+        fig.add_trace(go.Scattergl(x=pe.index, y=pe,
                                  mode='lines', name=symbol,
                                  line=dict(color=color),
                                  hovertemplate=hovertemplate), row=1, col=1)
 
         # PB Ratio
-        fig.add_trace(go.Scatter(x=symbol_data['date'], y=symbol_data['pb'],
+        fig.add_trace(go.Scattergl(x=pb.index, y=pb,
                                  mode='lines', name=symbol, showlegend=False,
                                  line=dict(color=color),
                                  hovertemplate=hovertemplate), row=2, col=1)
 
         # Dividend Yield
-        fig.add_trace(go.Scatter(x=symbol_data['date'], y=symbol_data['dividend_yield'],
+        fig.add_trace(go.Scattergl(x=dividend_yield.index, y=dividend_yield,
                                  mode='lines', name=symbol, showlegend=False,
                                  line=dict(color=color),
                                  hovertemplate=hovertemplate), row=3, col=1)
@@ -415,17 +466,27 @@ def plot_correlation_heatmap(index_data: pd.DataFrame, selected_symbols: List[st
     preprocessed and is sorted by date.
     """
     # Calculate returns
-    returns_data = index_data[selected_symbols].pct_change().dropna()
-
-    # Calculate correlation matrix
-    corr_matrix = returns_data.corr()
+    returns_data = index_data[selected_symbols].pct_change(fill_method=None).dropna()
+
+    # Calculate correlation matrix (rows are already NaN-free): standardize the
+    # columns, then a single matrix product gives the correlations. float32 like the
+    # prices: the heatmap shows 2 decimals
+    returns = returns_data.to_numpy(dtype='float32')
+    if len(returns) < 2:
+        # no overlapping returns to correlate: NaN like DataFrame.corr
+        corr = np.full((returns.shape[1], returns.shape[1]), np.nan, dtype='float32')
+    else:
+        returns = returns - returns.mean(axis=0)
+        returns /= returns.std(axis=0, ddof=1)
+        corr = np.clip(returns.T @ returns / (len(returns) - 1), -1, 1)
+    corr_matrix = pd.DataFrame(corr, index=returns_data.columns, columns=returns_data.columns)
 
     # Create mask for upper triangle
-    mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
+    mask = np.triu(np.ones_like(corr, dtype=bool))
 
     # Create heatmap
     heatmap = go.Heatmap(
-        z=corr_matrix.mask(mask),
+        z=np.where(mask, np.nan, corr),
         x=corr_matrix.columns,
         y=corr_matrix.columns,
         zmin=-1, zmax=1,
@@ -435,21 +496,21 @@ def plot_correlation_heatmap(index_data: pd.DataFrame, selected_symbols: List[st
         hovertemplate='%{x}<br>%{y}<br>Correlation: %{z:.2f}<extra></extra>'
     )
 
-    # Create annotations
-    annotations = []
-    for i, row in enumerate(corr_matrix.values):
-        for j, value in enumerate(row):
-            if i <= j:  # Only annotate lower triangle
-                continue
-            annotations.append(
-                dict(
-                    x=corr_matrix.columns[j],
-                    y=corr_matrix.index[i],
-                    text=f'{value:.2f}',
-                    showarrow=False,
-                    font=dict(color='white' if abs(value) > 0.5 else 'black')
-                )
-            )
+    # Create annotations, only for the lower triangle
+    rows, cols = np.tril_indices(len(corr), k=-1)
+    values = corr[rows, cols]
+    font_colors = np.where(np.abs(values) > 0.5, 'white', 'black')
+    symbols = corr_matrix.columns.to_numpy()
+    annotations = [
+        dict(
+            x=symbols[j],
+            y=symbols[i],
+            text=f'{value:.2f}',
+            showarrow=False,
+            font=dict(color=font_color)
+        )
+        for i, j, value, font_color in zip(rows, cols, values, font_colors)
+    ]
 
     # Create layout
     layout = go.Layout(